@@ -7,6 +7,39 @@ class Settings:
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     
+    @property
+    def AWS_ACCOUNTS_CONFIG(self) -> list[dict]:
+        accounts_str = os.getenv('AWS_ACCOUNTS')
+        
+        # Without AWS_ACCOUNTS, the single key pair above is the only account
+        if not accounts_str:
+            return [{
+                'name': 'default',
+                'access_key_id': self.AWS_ACCESS_KEY_ID,
+                'secret_access_key': self.AWS_SECRET_ACCESS_KEY
+            }]
+        
+        accounts = []
+        for name in (account.strip() for account in accounts_str.split(',')):
+            prefix = f"AWS_ACCOUNT_{name.upper().replace('-', '_')}"
+            access_key_id = os.getenv(f'{prefix}_ACCESS_KEY_ID')
+            secret_access_key = os.getenv(f'{prefix}_SECRET_ACCESS_KEY')
+            if not access_key_id or not secret_access_key:
+                raise ValueError(f"{prefix}_ACCESS_KEY_ID and {prefix}_SECRET_ACCESS_KEY must be set")
+            accounts.append({
+                'name': name,
+                'access_key_id': access_key_id,
+                'secret_access_key': secret_access_key
+            })
+        return accounts
+    
+    @property
+    def AWS_THROTTLE_COOLDOWN(self) -> float:
+        value = float(os.getenv('AWS_THROTTLE_COOLDOWN', '5'))
+        if value < 0:
+            raise ValueError("AWS_THROTTLE_COOLDOWN must not be negative")
+        return value
+    
     @property
     def AWS_REGIONS(self) -> list[str]:
         regions_str = os.getenv('AWS_REGIONS')
@@ -56,4 +89,67 @@ class Settings:
             raise ValueError("CIRCUIT_BREAKER_SUCCESS_THRESHOLD must be at least 1")
         return value
 
+    # Scheduler Settings
+    @property
+    def SCHEDULER_PRIORITY_WEIGHTS(self) -> dict[str, int]:
+        weights_str = os.getenv('SCHEDULER_PRIORITY_WEIGHTS', 'interactive:4,batch:1')
+        weights = {}
+        for entry in weights_str.split(','):
+            name, weight = entry.split(':')
+            weights[name.strip()] = int(weight.strip())
+            if weights[name.strip()] < 1:
+                raise ValueError("SCHEDULER_PRIORITY_WEIGHTS values must be at least 1")
+        return weights
+
+    @property
+    def SCHEDULER_DEFAULT_PRIORITY(self) -> str:
+        value = os.getenv('SCHEDULER_DEFAULT_PRIORITY', 'interactive')
+        if value not in self.SCHEDULER_PRIORITY_WEIGHTS:
+            raise ValueError("SCHEDULER_DEFAULT_PRIORITY must be one of SCHEDULER_PRIORITY_WEIGHTS")
+        return value
+
+    def _priority_values(self, name: str, default: str, cast) -> dict:
+        """Per priority class values (class:value, comma-separated); a single value applies to every class"""
+        values_str = os.getenv(name, default)
+        if ':' not in values_str:
+            return {priority: cast(values_str.strip()) for priority in self.SCHEDULER_PRIORITY_WEIGHTS}
+        values = {}
+        for entry in values_str.split(','):
+            priority, value = entry.split(':')
+            values[priority.strip()] = cast(value.strip())
+        if set(values) != set(self.SCHEDULER_PRIORITY_WEIGHTS):
+            raise ValueError(f"{name} must set a value for every class in SCHEDULER_PRIORITY_WEIGHTS")
+        return values
+
+    @property
+    def SCHEDULER_MAX_QUEUE_LENGTH(self) -> dict[str, int]:
+        values = self._priority_values('SCHEDULER_MAX_QUEUE_LENGTH', '100', int)
+        if min(values.values()) < 1:
+            raise ValueError("SCHEDULER_MAX_QUEUE_LENGTH values must be at least 1")
+        return values
+
+    @property
+    def SCHEDULER_QUEUE_TIMEOUT(self) -> dict[str, float]:
+        values = self._priority_values('SCHEDULER_QUEUE_TIMEOUT', '10', float)
+        if min(values.values()) <= 0:
+            raise ValueError("SCHEDULER_QUEUE_TIMEOUT values must be greater than 0 seconds")
+        return values
+
+    @property
+    def SCHEDULER_REGION_CONCURRENCY(self) -> int:
+        value = int(os.getenv('SCHEDULER_REGION_CONCURRENCY', '4'))
+        if value < 1:
+            raise ValueError("SCHEDULER_REGION_CONCURRENCY must be at least 1")
+        return value
+
+    # Trace Recorder Settings
+    TRACE_FILE = os.getenv('TRACE_FILE')
+
+    @property
+    def TRACE_BUFFER_SIZE(self) -> int:
+        value = int(os.getenv('TRACE_BUFFER_SIZE', '65536'))
+        if value < 1:
+            raise ValueError("TRACE_BUFFER_SIZE must be at least 1")
+        return value
+
 settings = Settings() 
\ No newline at end of file
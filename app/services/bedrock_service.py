@@ -4,52 +4,84 @@ from botocore.exceptions import ClientError
 from app.core.config import settings
 from app.services.load_balancer import LoadBalancer
 from app.services.circuit_breaker import circuit_protected
+from app.services.scheduler import RequestScheduler
+from app.services.trace_recorder import trace_recorder, classify_error, ErrorClass
+from app.services.credential_pool import credential_pool, endpoint_name, DEFAULT_ACCOUNT
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class RegionMapper:
     def __init__(self):
+        # Keyed by region or endpoint name; endpoint name mappings take precedence
         self.mappings = {}
+        self.account_mappings = {}
     
-    def get_effective_region(self, region: str) -> str:
+    def get_effective_region(self, region: str, name: str | None = None) -> str:
         """Get the effective region to use (mapped or original)"""
+        if name in self.mappings:
+            return self.mappings[name]
         return self.mappings.get(region, region)
     
-    def set_mapping(self, source_region: str, target_region: str):
-        """Set a region mapping"""
+    def get_effective_account(self, account: str, region: str, name: str | None = None) -> str:
+        """Get the effective account to use (mapped or original)"""
+        if name in self.account_mappings:
+            return self.account_mappings[name]
+        return self.account_mappings.get(region, account)
+    
+    def set_mapping(self, source_region: str, target_region: str, target_account: str | None = None):
+        """Set a region mapping, optionally moving the endpoint to another account"""
+        if target_account:
+            credential_pool.get_account(target_account)
         self.mappings[source_region] = target_region
-        logger.info(f"Mapped region {source_region} to {target_region}")
+        if target_account:
+            self.account_mappings[source_region] = target_account
+            logger.info(f"Mapped region {source_region} to {target_region} in account {target_account}")
+        else:
+            self.account_mappings.pop(source_region, None)
+            logger.info(f"Mapped region {source_region} to {target_region}")
     
     def clear_mappings(self):
         """Clear all mappings"""
         self.mappings = {}
+        self.account_mappings = {}
         logger.info("Cleared all region mappings")
 
 # Create a global instance
 region_mapper = RegionMapper()
 
 class BedrockEndpoint:
-    def __init__(self, region: str):
+    def __init__(self, region: str, account: str = DEFAULT_ACCOUNT):
         self.region = region
+        self.account = account
+        self.name = endpoint_name(account, region)
         self._create_client(region)
     
     def _create_client(self, region: str):
         """Create a new boto3 client for the specified region"""
-        effective_region = region_mapper.get_effective_region(region)
+        effective_region = region_mapper.get_effective_region(region, self.name)
+        effective_account = region_mapper.get_effective_account(self.account, region, self.name)
+        credentials = credential_pool.get_account(effective_account)
         self.client = boto3.client(
             service_name='bedrock-runtime',
             region_name=effective_region,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+            aws_access_key_id=credentials.access_key_id,
+            aws_secret_access_key=credentials.secret_access_key
+        )
+        logger.info(
+            f"Created client for {self.name} "
+            f"(effective region: {effective_region}, account: {effective_account})"
         )
-        logger.info(f"Created client for region {region} (effective: {effective_region})")
     
     @circuit_protected
     async def generate_response(self, messages: list, system_prompts: list):
         # Recreate client to ensure we're using the current mapping
         self._create_client(self.region)
-        return self.client.converse(
+        # boto3 blocks, so the call runs in a worker thread to keep other admitted requests moving
+        return await asyncio.to_thread(
+            self.client.converse,
             modelId=settings.MODEL_ID,
             messages=messages,
             system=system_prompts,
@@ -61,15 +93,18 @@ class BedrockService:
     def __init__(self):
         self.load_balancer = LoadBalancer(strategy=settings.LOAD_BALANCER_STRATEGY)
         
-        # Add endpoints from configuration
+        # Add an endpoint for every (account, region) pair in the configuration
         for config in settings.AWS_REGIONS_CONFIG:
             region = config['region']
             weight = config['weight']
-            logger.info(f"Adding endpoint for {region} with weight {weight}")
-            self.load_balancer.add_endpoint(
-                BedrockEndpoint(region),
-                weight=weight
-            )
+            for account in credential_pool.account_names:
+                logger.info(f"Adding endpoint for {region} in account {account} with weight {weight}")
+                self.load_balancer.add_endpoint(
+                    BedrockEndpoint(region, account),
+                    weight=weight
+                )
+        
+        self.scheduler = RequestScheduler(self.load_balancer)
 
     def _log_token_usage(self, response: dict) -> None:
         """Log token usage metrics from the response"""
@@ -84,9 +119,35 @@ class BedrockService:
         except Exception as e:
             logger.warning(f"Failed to log token usage: {str(e)}")
 
-    async def generate_conversation(self, message_content: str, system_prompt: str | None = None):
+    async def generate_conversation(
+        self,
+        message_content: str,
+        system_prompt: str | None = None,
+        priority: str | None = None
+    ):
+        if priority is not None and priority not in self.scheduler.classes:
+            raise HTTPException(status_code=400, detail=f"Unknown priority class: {priority}")
         try:
-            endpoint = self.load_balancer.get_next_endpoint()
+            async with self.scheduler.slot(priority):
+                return await self._generate_conversation(message_content, system_prompt)
+        except HTTPException:
+            raise
+        except Exception as err:
+            message = str(err)
+            logger.warning("Request not scheduled: %s", message)
+            raise HTTPException(status_code=503, detail=message)
+
+    async def _generate_conversation(self, message_content: str, system_prompt: str | None = None):
+        try:
+            # Skip endpoints already using all of their scheduler slots
+            try:
+                endpoint = self.load_balancer.get_next_endpoint(
+                    exclude=self.scheduler.get_saturated_endpoints()
+                )
+            except Exception:
+                # Keep rejected requests in the trace so replays see the full load
+                trace_recorder.record(time.time(), "", 0.0, ErrorClass.NO_ENDPOINT)
+                raise
             
             system_prompts = [{"text": system_prompt or "You are a helpful AI assistant."}]
             messages = [{
@@ -94,23 +155,44 @@ class BedrockService:
                 "content": [{"text": message_content}]
             }]
 
-            try:
-                response = await endpoint.generate_response(messages, system_prompts)
-                
-                # Add region information to response
-                response['region'] = endpoint.region
-                
-                # Mark endpoint as healthy on successful response
-                self.load_balancer.mark_endpoint_healthy(endpoint)
-                
-                self._log_token_usage(response)
-                return response
+            with self.scheduler.track_endpoint(endpoint.name):
+                started_at = time.time()
+                try:
+                    response = await endpoint.generate_response(messages, system_prompts)
+                    trace_recorder.record(
+                        started_at,
+                        endpoint.name,
+                        (time.time() - started_at) * 1000,
+                        classify_error(None),
+                        response.get('usage', {}).get('totalTokens', 0)
+                    )
+                    
+                    # Add region and account information to response
+                    response['region'] = endpoint.region
+                    response['account'] = endpoint.account
+                    
+                    # Mark endpoint as healthy on successful response
+                    self.load_balancer.mark_endpoint_healthy(endpoint)
+                    
+                    self._log_token_usage(response)
+                    return response
 
-            except Exception as err:
-                # Mark endpoint as unhealthy on failure
-                self.load_balancer.mark_endpoint_unhealthy(endpoint)
-                logger.error(f"Error in region {endpoint.region}: {str(err)}")
-                raise
+                except Exception as err:
+                    error_class = classify_error(err)
+                    trace_recorder.record(
+                        started_at,
+                        endpoint.name,
+                        (time.time() - started_at) * 1000,
+                        error_class
+                    )
+                    
+                    # Mark endpoint as unhealthy on failure
+                    self.load_balancer.mark_endpoint_unhealthy(endpoint)
+                    if error_class == ErrorClass.THROTTLED:
+                        # Quota is per account, so other accounts in this region stay in rotation
+                        self.load_balancer.mark_endpoint_throttled(endpoint, settings.AWS_THROTTLE_COOLDOWN)
+                    logger.error(f"Error in {endpoint.name}: {str(err)}")
+                    raise
 
         except Exception as err:
             message = str(err)
@@ -1,5 +1,6 @@
 from enum import Enum
-from typing import Dict, Any
+from typing import Dict, Any, Callable, NamedTuple
+import threading
 import time
 import logging
 from functools import wraps
@@ -12,85 +13,149 @@ class CircuitState(Enum):
     OPEN = "open"
     HALF_OPEN = "half_open"
 
+class CircuitSnapshot(NamedTuple):
+    """Immutable view of a circuit breaker's state, replaced as a whole on every transition"""
+    state: CircuitState
+    failure_count: int
+    success_count: int
+    last_failure_time: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "failure_count": self.failure_count,
+            "last_failure_time": self.last_failure_time,
+            "success_count": self.success_count
+        }
+
+INITIAL_SNAPSHOT = CircuitSnapshot(CircuitState.CLOSED, 0, 0, 0)
+
 class CircuitBreaker:
     def __init__(
         self,
         failure_threshold: int = settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
         recovery_timeout: int = settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
-        success_threshold: int = settings.CIRCUIT_BREAKER_SUCCESS_THRESHOLD
+        success_threshold: int = settings.CIRCUIT_BREAKER_SUCCESS_THRESHOLD,
+        clock: Callable[[], float] = time.time
     ):
+        self.clock = clock
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
         self.success_threshold = success_threshold
-        self.state = CircuitState.CLOSED
-        self.failure_count = 0
-        self.success_count = 0
-        self.last_failure_time = 0
+        self._snapshot = INITIAL_SNAPSHOT
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        return self._snapshot.state
+
+    @property
+    def failure_count(self) -> int:
+        return self._snapshot.failure_count
+
+    @property
+    def success_count(self) -> int:
+        return self._snapshot.success_count
+
+    @property
+    def last_failure_time(self) -> float:
+        return self._snapshot.last_failure_time
+
+    def snapshot(self) -> CircuitSnapshot:
+        return self._snapshot
+
+    def _compare_and_swap(self, expected: CircuitSnapshot, new: CircuitSnapshot) -> bool:
+        """Install new only if no other thread replaced expected in the meantime"""
+        with self._lock:
+            if self._snapshot is not expected:
+                return False
+            self._snapshot = new
+            return True
         
     def record_failure(self):
-        self.failure_count += 1
-        self.success_count = 0
-        self.last_failure_time = time.time()
+        while True:
+            current = self._snapshot
+            failure_count = current.failure_count + 1
+            state = CircuitState.OPEN if failure_count >= self.failure_threshold else current.state
+            new = CircuitSnapshot(state, failure_count, 0, self.clock())
+            if self._compare_and_swap(current, new):
+                break
         
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
-            logger.warning(f"Circuit breaker opened after {self.failure_count} failures")
+        if state == CircuitState.OPEN:
+            logger.warning(f"Circuit breaker opened after {failure_count} failures")
     
     def record_success(self):
-        if self.state == CircuitState.HALF_OPEN:
-            self.success_count += 1
-            logger.info(f"Circuit breaker recorded success ({self.success_count}/{self.success_threshold})")
-            
-            if self.success_count >= self.success_threshold:
-                self.state = CircuitState.CLOSED
-                self.failure_count = 0
-                self.success_count = 0
-                self.last_failure_time = 0
+        while True:
+            current = self._snapshot
+            if current.state == CircuitState.HALF_OPEN:
+                success_count = current.success_count + 1
+                if success_count >= self.success_threshold:
+                    new = INITIAL_SNAPSHOT
+                else:
+                    new = current._replace(success_count=success_count)
+            elif current.failure_count == 0:
+                return
+            else:
+                new = current._replace(failure_count=0)
+            if self._compare_and_swap(current, new):
+                break
+        
+        if current.state == CircuitState.HALF_OPEN:
+            logger.info(f"Circuit breaker recorded success ({success_count}/{self.success_threshold})")
+            if new.state == CircuitState.CLOSED:
                 logger.info(f"Circuit breaker closed after {self.success_threshold} successful requests")
-        else:
-            self.failure_count = 0
     
     def can_execute(self) -> bool:
-        if self.state == CircuitState.CLOSED:
+        current = self._snapshot
+        if current.state == CircuitState.CLOSED:
             return True
             
-        if self.state == CircuitState.OPEN:
-            if time.time() - self.last_failure_time >= self.recovery_timeout:
-                self.state = CircuitState.HALF_OPEN
-                self.success_count = 0
-                logger.info("Circuit breaker entering half-open state")
-                return True
+        if current.state == CircuitState.OPEN:
+            if self.clock() - current.last_failure_time >= self.recovery_timeout:
+                # Only the thread that wins the swap logs the transition
+                if self._compare_and_swap(current, current._replace(state=CircuitState.HALF_OPEN, success_count=0)):
+                    logger.info("Circuit breaker entering half-open state")
+                return self._snapshot.state != CircuitState.OPEN
             return False
             
         # HALF_OPEN state
         return True
 
+    def peek_state(self) -> CircuitState:
+        """State can_execute would act on, without making the open to half-open transition"""
+        current = self._snapshot
+        if current.state == CircuitState.OPEN and self.clock() - current.last_failure_time >= self.recovery_timeout:
+            return CircuitState.HALF_OPEN
+        return current.state
+
     def get_state_info(self) -> Dict[str, Any]:
-        return {
-            "state": self.state.value,
-            "failure_count": self.failure_count,
-            "success_count": self.success_count,
-            "last_failure_time": self.last_failure_time
-        }
+        return self._snapshot.to_dict()
 
 class RegionalCircuitBreaker:
-    def __init__(self):
+    def __init__(self, **breaker_options):
+        # Options passed to every CircuitBreaker created for a region
+        self.breaker_options = breaker_options
         self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
     
     def get_breaker(self, region: str) -> CircuitBreaker:
-        if region not in self.breakers:
-            self.breakers[region] = CircuitBreaker()
-        return self.breakers[region]
+        breaker = self.breakers.get(region)
+        if breaker is None:
+            # Each region's breaker is its own shard, so the lock is only taken on first use
+            with self._lock:
+                breaker = self.breakers.get(region)
+                if breaker is None:
+                    breaker = CircuitBreaker(**self.breaker_options)
+                    self.breakers = {**self.breakers, region: breaker}
+        return breaker
+    
+    def get_snapshot(self) -> Dict[str, CircuitSnapshot]:
+        return {region: breaker.snapshot() for region, breaker in self.breakers.items()}
     
     def get_status(self) -> Dict[str, Any]:
         return {
-            region: {
-                "state": breaker.state.value,
-                "failure_count": breaker.failure_count,
-                "last_failure_time": breaker.last_failure_time,
-                "success_count": breaker.success_count
-            }
-            for region, breaker in self.breakers.items()
+            region: snapshot.to_dict()
+            for region, snapshot in self.get_snapshot().items()
         }
 
 regional_circuit_breaker = RegionalCircuitBreaker()
@@ -99,10 +164,10 @@ def circuit_protected(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
         endpoint = args[0]  # First arg is self (BedrockEndpoint instance)
-        breaker = regional_circuit_breaker.get_breaker(endpoint.region)
+        breaker = regional_circuit_breaker.get_breaker(endpoint.name)
         
         if not breaker.can_execute():
-            raise Exception(f"Circuit breaker is open for region {endpoint.region}")
+            raise Exception(f"Circuit breaker is open for region {endpoint.name}")
         
         try:
             result = await func(*args, **kwargs)
@@ -110,7 +175,7 @@ def circuit_protected(func):
             return result
         except Exception as e:
             breaker.record_failure()
-            logger.error(f"Circuit breaker recorded failure for region {endpoint.region}: {str(e)}")
+            logger.error(f"Circuit breaker recorded failure for region {endpoint.name}: {str(e)}")
             raise
     
     return wrapper 
\ No newline at end of file
@@ -0,0 +1,54 @@
+from typing import Dict, Any, List
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = "default"
+
+class AccountCredentials:
+    def __init__(self, name: str, access_key_id: str, secret_access_key: str):
+        self.name = name
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+
+class CredentialPool:
+    """
+    Credentials for every configured AWS account.
+    Each account is paired with every region, so per-region quota grows with the number of accounts.
+    """
+    def __init__(self, accounts_config: List[dict]):
+        self.accounts: Dict[str, AccountCredentials] = {}
+        for config in accounts_config:
+            self.add_account(AccountCredentials(**config))
+
+    def add_account(self, account: AccountCredentials):
+        self.accounts[account.name] = account
+        logger.info(f"Added credentials for account {account.name}")
+
+    def get_account(self, name: str) -> AccountCredentials:
+        if name not in self.accounts:
+            raise Exception(f"Unknown account: {name}")
+        return self.accounts[name]
+
+    @property
+    def account_names(self) -> List[str]:
+        return list(self.accounts)
+
+    def get_status(self) -> Dict[str, Any]:
+        # Never expose the keys themselves
+        return {
+            "accounts": [
+                {
+                    "name": account.name,
+                    "access_key_id": f"...{account.access_key_id[-4:]}" if account.access_key_id else None
+                }
+                for account in self.accounts.values()
+            ]
+        }
+
+def endpoint_name(account: str, region: str) -> str:
+    """Circuit breaker and load balancer key for an (account, region) endpoint"""
+    return region if account == DEFAULT_ACCOUNT else f"{region}@{account}"
+
+credential_pool = CredentialPool(settings.AWS_ACCOUNTS_CONFIG)
@@ -1,9 +1,11 @@
 from enum import Enum
-from typing import List, Any
+from typing import List, Any, Dict, AbstractSet, Callable
 import random
 import logging
+import threading
+import time
 from collections import deque
-from app.services.circuit_breaker import regional_circuit_breaker, CircuitState
+from app.services.circuit_breaker import regional_circuit_breaker, RegionalCircuitBreaker, CircuitState
 
 logger = logging.getLogger(__name__)
 
@@ -13,44 +15,96 @@ class LoadBalancerStrategy(Enum):
     FAILOVER = "failover"
 
 class LoadBalancer:
-    def __init__(self, strategy: str = LoadBalancerStrategy.ROUND_ROBIN.value):
+    def __init__(
+        self,
+        strategy: str = LoadBalancerStrategy.ROUND_ROBIN.value,
+        circuit_breaker: RegionalCircuitBreaker = regional_circuit_breaker,
+        clock: Callable[[], float] = time.time
+    ):
         self.strategy = LoadBalancerStrategy(strategy)
+        self.circuit_breaker = circuit_breaker
+        # Throttle cooldowns use the same injectable clock as the circuit breakers
+        self.clock = clock
+        # The list and its entries are never modified in place: every change installs
+        # a new list under _lock, so readers can iterate a snapshot without locking
         self.endpoints: List[dict] = []
         self._rotation_index = 0
+        self._failover_index = 0
+        self._lock = threading.Lock()
         logger.info(f"Initializing LoadBalancer with strategy: {strategy}")
     
-    def _get_weighted_sequence(self) -> List[int]:
+    def _get_weighted_sequence(self, endpoints: List[dict]) -> List[int]:
         """Generate the complete weighted sequence of endpoint indices"""
         sequence = []
-        for idx, endpoint in enumerate(self.endpoints):
+        for idx, endpoint in enumerate(endpoints):
             weight = endpoint["weight"]
             sequence.extend([idx] * weight)
         return sequence
     
-    def _is_endpoint_available(self, endpoint_data: dict) -> bool:
-        """Check if endpoint is both healthy and circuit breaker allows execution"""
+    def _is_endpoint_available(self, endpoint_data: dict, exclude: AbstractSet[str] = frozenset()) -> bool:
+        """Check if endpoint is not excluded or throttled and circuit breaker allows execution"""
         endpoint = endpoint_data["endpoint"]
-        breaker = regional_circuit_breaker.get_breaker(endpoint.region)
+        if endpoint.name in exclude:
+            return False
+        if self._is_endpoint_throttled(endpoint_data):
+            return False
+        breaker = self.circuit_breaker.get_breaker(endpoint.name)
         return breaker.can_execute()
     
-    def _round_robin(self) -> Any:
+    def _is_endpoint_throttled(self, endpoint_data: dict) -> bool:
+        return endpoint_data["throttled_until"] > self.clock()
+    
+    def _advance_rotation(self, sequence_length: int) -> int:
+        """Atomically take the current rotation position and move to the next one"""
+        with self._lock:
+            position = self._rotation_index % sequence_length
+            self._rotation_index = (position + 1) % sequence_length
+            return position
+    
+    def _advance_failover(self, group_size: int) -> int:
+        """Atomically take the next position among the accounts of the preferred region"""
+        with self._lock:
+            position = self._failover_index % group_size
+            self._failover_index = position + 1
+            return position
+    
+    def get_region_capacity(self, concurrency_per_region: int) -> Dict[str, int]:
+        """
+        Concurrent request slots per (account, region) endpoint based on circuit breaker state
+        Closed endpoints get full concurrency, half-open endpoints a single probe slot
+        Read-only: an open breaker past its recovery timeout counts as half-open but is not moved
+        """
+        capacity = {}
+        for endpoint_data in self.endpoints:
+            name = endpoint_data["endpoint"].name
+            state = self.circuit_breaker.get_breaker(name).peek_state()
+            if self._is_endpoint_throttled(endpoint_data) or state == CircuitState.OPEN:
+                capacity[name] = 0
+            elif state == CircuitState.HALF_OPEN:
+                capacity[name] = 1
+            else:
+                capacity[name] = concurrency_per_region
+        return capacity
+    
+    def _round_robin(self, exclude: AbstractSet[str] = frozenset()) -> Any:
         """
         Weighted round-robin implementation using rotation index
         """
-        if not self.endpoints:
+        endpoints = self.endpoints
+        if not endpoints:
             raise Exception("No endpoints available")
 
         # Update to check both health and circuit breaker
-        available_indices = [
-            idx for idx, ep in enumerate(self.endpoints) 
-            if self._is_endpoint_available(ep)
-        ]
+        available_indices = {
+            idx for idx, ep in enumerate(endpoints) 
+            if self._is_endpoint_available(ep, exclude)
+        }
         
         if not available_indices:
             raise Exception("No available endpoints")
 
         # Get the complete weighted sequence
-        sequence = self._get_weighted_sequence()
+        sequence = self._get_weighted_sequence(endpoints)
         sequence_length = len(sequence)
         
         if sequence_length == 0:
@@ -59,15 +113,15 @@ class LoadBalancer:
         # Try to find next healthy endpoint
         for _ in range(sequence_length):
             # Get current index and move to next position
-            current_idx = sequence[self._rotation_index]
-            self._rotation_index = (self._rotation_index + 1) % sequence_length
+            position = self._advance_rotation(sequence_length)
+            current_idx = sequence[position]
             
             if current_idx in available_indices:
-                endpoint = self.endpoints[current_idx]
+                endpoint = endpoints[current_idx]
                 logger.info(
-                    f"Round Robin selection: region={endpoint['endpoint'].region}, "
+                    f"Round Robin selection: endpoint={endpoint['endpoint'].name}, "
                     f"weight={endpoint['weight']}, "
-                    f"rotation_index={self._rotation_index}, "
+                    f"rotation_index={(position + 1) % sequence_length}, "
                     f"sequence={sequence}"
                 )
                 return endpoint["endpoint"]
@@ -76,32 +130,35 @@ class LoadBalancer:
     
     def add_endpoint(self, endpoint: Any, weight: int = 1):
         """Add endpoint with specified weight"""
-        self.endpoints.append({
-            "endpoint": endpoint,
-            "weight": weight,
-            "healthy": True
-        })
-        logger.info(f"Added endpoint {endpoint.region} with weight {weight}")
+        with self._lock:
+            self.endpoints = self.endpoints + [{
+                "endpoint": endpoint,
+                "weight": weight,
+                "healthy": True,
+                "throttled_until": 0,
+                "throttle_count": 0
+            }]
+        logger.info(f"Added endpoint {endpoint.name} with weight {weight}")
     
-    def get_next_endpoint(self) -> Any:
-        """Get next endpoint based on selected strategy"""
+    def get_next_endpoint(self, exclude: AbstractSet[str] = frozenset()) -> Any:
+        """Get next endpoint based on selected strategy, skipping endpoint names in exclude"""
         if not self.endpoints:
             raise Exception("No endpoints available")
             
         if self.strategy == LoadBalancerStrategy.ROUND_ROBIN:
-            return self._round_robin()
+            return self._round_robin(exclude)
         elif self.strategy == LoadBalancerStrategy.WEIGHTED:
-            return self._weighted()
+            return self._weighted(exclude)
         elif self.strategy == LoadBalancerStrategy.FAILOVER:
-            return self._failover()
+            return self._failover(exclude)
     
-    def _weighted(self) -> Any:
+    def _weighted(self, exclude: AbstractSet[str] = frozenset()) -> Any:
         """
         Random selection with probability proportional to weights
         Higher weights have higher chance of being selected
         """
         # Update to check both health and circuit breaker
-        available_endpoints = [ep for ep in self.endpoints if self._is_endpoint_available(ep)]
+        available_endpoints = [ep for ep in self.endpoints if self._is_endpoint_available(ep, exclude)]
         if not available_endpoints:
             raise Exception("No available endpoints")
         
@@ -118,46 +175,93 @@ class LoadBalancer:
         # Select endpoint based on weights
         endpoint = random.choices(available_endpoints, weights=probabilities, k=1)[0]
         logger.info(
-            f"Weighted selection chose endpoint in region: {endpoint['endpoint'].region} "
+            f"Weighted selection chose endpoint: {endpoint['endpoint'].name} "
             f"(weight: {endpoint['weight']}, probability: {endpoint['weight']/total_weight:.2%})"
         )
         return endpoint["endpoint"]
     
-    def _failover(self) -> Any:
+    def _failover(self, exclude: AbstractSet[str] = frozenset()) -> Any:
         """
         Failover strategy prioritizing endpoints by weight
-        Higher weights are tried first
+        Higher weights are tried first, equal weights in the order they were added
+        Traffic for the preferred region is rotated among its available accounts
         """
-        # Sort endpoints by weight (highest to lowest)
+        # Sort endpoints by weight (highest to lowest); the sort is stable, so ties keep insertion order
         sorted_endpoints = sorted(
             self.endpoints,
-            key=lambda x: (x["weight"], id(x)),  # Use id as tiebreaker for stable sorting
+            key=lambda x: x["weight"],
             reverse=True
         )
         
         # Try endpoints in weight order, checking both health and circuit breaker
-        for endpoint in sorted_endpoints:
-            if self._is_endpoint_available(endpoint):
-                logger.info(
-                    f"Failover selected endpoint in region: {endpoint['endpoint'].region} "
-                    f"(weight: {endpoint['weight']})"
-                )
-                return endpoint["endpoint"]
+        preferred = next((ep for ep in sorted_endpoints if self._is_endpoint_available(ep, exclude)), None)
+        if preferred is None:
+            raise Exception("No available endpoints")
         
-        raise Exception("No available endpoints")
+        # The same region and weight through other accounts shares the load
+        group = [preferred] + [
+            ep for ep in sorted_endpoints
+            if ep is not preferred
+            and ep["endpoint"].region == preferred["endpoint"].region
+            and ep["weight"] == preferred["weight"]
+            and self._is_endpoint_available(ep, exclude)
+        ]
+        endpoint = group[self._advance_failover(len(group))] if len(group) > 1 else preferred
+        logger.info(
+            f"Failover selected endpoint: {endpoint['endpoint'].name} "
+            f"(weight: {endpoint['weight']})"
+        )
+        return endpoint["endpoint"]
+    
+    def _update_endpoint(self, endpoint: Any, update: Callable[[dict], dict]) -> dict | None:
+        """
+        Replace an endpoint's entry with an updated copy under the lock
+        update receives the current entry and returns the fields to change
+        """
+        with self._lock:
+            for idx, ep in enumerate(self.endpoints):
+                if ep["endpoint"] == endpoint:
+                    updated = {**ep, **update(ep)}
+                    self.endpoints = self.endpoints[:idx] + [updated] + self.endpoints[idx + 1:]
+                    return updated
+        return None
     
     def mark_endpoint_unhealthy(self, endpoint: Any):
         """Mark an endpoint as unhealthy"""
-        for ep in self.endpoints:
-            if ep["endpoint"] == endpoint:
-                ep["healthy"] = False
-                logger.warning(f"Marked endpoint in region {endpoint.region} as unhealthy")
-                break
+        if self._update_endpoint(endpoint, lambda ep: {"healthy": False}):
+            logger.warning(f"Marked endpoint {endpoint.name} as unhealthy")
     
     def mark_endpoint_healthy(self, endpoint: Any):
         """Mark an endpoint as healthy"""
-        for ep in self.endpoints:
-            if ep["endpoint"] == endpoint:
-                ep["healthy"] = True
-                logger.info(f"Marked endpoint in region {endpoint.region} as healthy")
-                break
\ No newline at end of file
+        if self._update_endpoint(endpoint, lambda ep: {"healthy": True}):
+            logger.info(f"Marked endpoint {endpoint.name} as healthy")
+    
+    def mark_endpoint_throttled(self, endpoint: Any, cooldown: float):
+        """Skip a throttled endpoint until its cooldown has passed"""
+        updated = self._update_endpoint(endpoint, lambda ep: {
+            "throttled_until": self.clock() + cooldown,
+            "throttle_count": ep["throttle_count"] + 1
+        })
+        if updated:
+            logger.warning(
+                f"Marked endpoint {endpoint.name} as throttled for {cooldown}s "
+                f"(throttle count: {updated['throttle_count']})"
+            )
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Point-in-time copy of the endpoint list for status reads"""
+        return {
+            "strategy": self.strategy.value,
+            "endpoints": [
+                {
+                    "name": ep["endpoint"].name,
+                    "region": ep["endpoint"].region,
+                    "account": ep["endpoint"].account,
+                    "healthy": ep["healthy"],
+                    "weight": ep["weight"],
+                    "throttled": self._is_endpoint_throttled(ep),
+                    "throttle_count": ep["throttle_count"]
+                }
+                for ep in self.endpoints
+            ]
+        }
\ No newline at end of file
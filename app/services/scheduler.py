@@ -0,0 +1,224 @@
+from typing import Dict, Any, Set, TypeVar
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import time
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def _class_value(value: T | Dict[str, T], name: str) -> T:
+    """A per-class setting, given either for every class or as a mapping by class name"""
+    return value[name] if isinstance(value, dict) else value
+
+class PriorityClass:
+    def __init__(self, name: str, weight: int, max_queue_length: int, queue_timeout: float):
+        self.name = name
+        self.weight = weight
+        self.max_queue_length = max_queue_length
+        self.queue_timeout = queue_timeout
+        self.queue: deque = deque()
+        self.last_finish_tag = 0.0
+        self.in_flight = 0
+        self.admitted_count = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.recent_wait_times: deque = deque(maxlen=1000)
+
+    def record_wait(self, wait_time: float):
+        self.admitted_count += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        self.recent_wait_times.append(wait_time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_wait_times)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "weight": self.weight,
+            "queue_length": len(self.queue),
+            "max_queue_length": self.max_queue_length,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "admitted_count": self.admitted_count,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "avg_wait_time": self.total_wait_time / self.admitted_count if self.admitted_count else 0.0,
+            "p50_wait_time": percentile(0.50),
+            "p95_wait_time": percentile(0.95),
+            "max_wait_time": self.max_wait_time
+        }
+
+class RequestScheduler:
+    """
+    Weighted fair queuing in front of the load balancer.
+    Each priority class gets a bounded queue with its own wait limit; requests are
+    admitted in order of their virtual finish tag while in-flight requests stay below the capacity
+    reported by the load balancer's circuit breakers. Admitted requests are
+    routed away from endpoints whose own slots are all in use, so a half-open
+    endpoint never receives more than its single probe.
+    """
+    def __init__(
+        self,
+        load_balancer,
+        priority_weights: Dict[str, int] = settings.SCHEDULER_PRIORITY_WEIGHTS,
+        default_priority: str = settings.SCHEDULER_DEFAULT_PRIORITY,
+        max_queue_length: int | Dict[str, int] = settings.SCHEDULER_MAX_QUEUE_LENGTH,
+        queue_timeout: float | Dict[str, float] = settings.SCHEDULER_QUEUE_TIMEOUT,
+        concurrency_per_region: int = settings.SCHEDULER_REGION_CONCURRENCY,
+        poll_interval: float = 0.5
+    ):
+        self.load_balancer = load_balancer
+        self.default_priority = default_priority
+        self.concurrency_per_region = concurrency_per_region
+        self.poll_interval = poll_interval
+        self.classes: Dict[str, PriorityClass] = {
+            name: PriorityClass(
+                name, weight, _class_value(max_queue_length, name), _class_value(queue_timeout, name)
+            )
+            for name, weight in priority_weights.items()
+        }
+        self.in_flight = 0
+        self.endpoint_in_flight: Dict[str, int] = {}
+        self._virtual_time = 0.0
+        logger.info(f"Initializing RequestScheduler with priority weights: {priority_weights}")
+
+    def get_capacity(self) -> int:
+        """Total concurrent request slots across all available regions"""
+        return sum(self.load_balancer.get_region_capacity(self.concurrency_per_region).values())
+
+    def get_saturated_endpoints(self) -> Set[str]:
+        """Endpoint names with no free slots, to be excluded from load balancer selection"""
+        capacity = self.load_balancer.get_region_capacity(self.concurrency_per_region)
+        return {
+            name for name, slots in capacity.items()
+            if self.endpoint_in_flight.get(name, 0) >= slots
+        }
+
+    @contextmanager
+    def track_endpoint(self, name: str):
+        """Count an admitted request against the endpoint it was routed to"""
+        self.endpoint_in_flight[name] = self.endpoint_in_flight.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self.endpoint_in_flight[name] -= 1
+
+    def _has_queued(self) -> bool:
+        return any(priority_class.queue for priority_class in self.classes.values())
+
+    def _finish_tag(self, priority_class: PriorityClass, arrival: float) -> float:
+        """Virtual finish tag of a request that arrived at virtual time arrival"""
+        return max(arrival, priority_class.last_finish_tag) + 1.0 / priority_class.weight
+
+    def _next_class(self) -> PriorityClass | None:
+        """Priority class whose head request has the smallest virtual finish tag"""
+        candidates = [pc for pc in self.classes.values() if pc.queue]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda pc: self._finish_tag(pc, pc.queue[0][0]))
+
+    def _admit(self, priority_class: PriorityClass, arrival: float, wait_time: float):
+        # Tags are only charged on admission, so shed requests cost their class nothing
+        priority_class.last_finish_tag = self._finish_tag(priority_class, arrival)
+        self._virtual_time = priority_class.last_finish_tag
+        self.in_flight += 1
+        priority_class.in_flight += 1
+        priority_class.record_wait(wait_time)
+
+    def _dispatch(self):
+        """Admit queued requests in fair order while capacity allows"""
+        if not self._has_queued():
+            return
+        capacity = self.get_capacity()
+        while self.in_flight < capacity:
+            priority_class = self._next_class()
+            if priority_class is None:
+                break
+            arrival, enqueued_at, future = priority_class.queue.popleft()
+            self._admit(priority_class, arrival, time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    def _release(self, priority_class: PriorityClass):
+        self.in_flight -= 1
+        priority_class.in_flight -= 1
+        self._dispatch()
+
+    async def _wait_in_queue(self, priority_class: PriorityClass):
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = (self._virtual_time, enqueued_at, future)
+        priority_class.queue.append(entry)
+
+        # Poll so regions recovering from an open circuit are picked up even
+        # when no in-flight request completes to trigger a dispatch
+        deadline = enqueued_at + priority_class.queue_timeout
+        try:
+            while not future.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    priority_class.queue.remove(entry)
+                    priority_class.shed_timeout += 1
+                    logger.warning(
+                        f"Shed {priority_class.name} request after waiting "
+                        f"{priority_class.queue_timeout}s in queue"
+                    )
+                    raise Exception(f"Queue wait time exceeded for priority {priority_class.name}")
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    self._dispatch()
+        except asyncio.CancelledError:
+            if future.done():
+                self._release(priority_class)
+            else:
+                priority_class.queue.remove(entry)
+            raise
+
+    async def acquire(self, priority: str | None = None) -> PriorityClass:
+        """Wait for a request slot, shedding the request if its queue is full or it waits too long"""
+        name = priority or self.default_priority
+        if name not in self.classes:
+            raise Exception(f"Unknown priority class: {name}")
+        priority_class = self.classes[name]
+
+        if not self._has_queued() and self.in_flight < self.get_capacity():
+            self._admit(priority_class, self._virtual_time, 0.0)
+            return priority_class
+
+        if len(priority_class.queue) >= priority_class.max_queue_length:
+            priority_class.shed_queue_full += 1
+            logger.warning(f"Shed {name} request: queue full ({priority_class.max_queue_length})")
+            raise Exception(f"Queue full for priority {name}")
+
+        await self._wait_in_queue(priority_class)
+        return priority_class
+
+    @asynccontextmanager
+    async def slot(self, priority: str | None = None):
+        priority_class = await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority_class)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "endpoint_in_flight": dict(self.endpoint_in_flight),
+            "capacity": self.load_balancer.get_region_capacity(self.concurrency_per_region),
+            "classes": {
+                name: priority_class.get_stats()
+                for name, priority_class in self.classes.items()
+            }
+        }
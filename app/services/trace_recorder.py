@@ -0,0 +1,204 @@
+from enum import IntEnum
+from typing import Dict, Any, List, Iterator, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import struct
+import logging
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ErrorClass(IntEnum):
+    NONE = 0
+    THROTTLED = 1
+    TIMEOUT = 2
+    CLIENT = 3
+    SERVER = 4
+    CIRCUIT_OPEN = 5
+    OTHER = 6
+    # The load balancer had no endpoint to offer; recorded with an empty region
+    NO_ENDPOINT = 7
+
+# Rejected before reaching Bedrock, so they say nothing about the region itself
+LOCAL_REJECTIONS = {ErrorClass.CIRCUIT_OPEN, ErrorClass.NO_ENDPOINT}
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+CLIENT_CODES = {"ValidationException", "AccessDeniedException", "ResourceNotFoundException"}
+
+def classify_error(err: Exception | None) -> ErrorClass:
+    """Map an exception raised by a Bedrock call to an ErrorClass"""
+    if err is None:
+        return ErrorClass.NONE
+    if isinstance(err, ClientError):
+        code = err.response.get("Error", {}).get("Code", "")
+        if code in THROTTLING_CODES:
+            return ErrorClass.THROTTLED
+        if code in CLIENT_CODES:
+            return ErrorClass.CLIENT
+        return ErrorClass.SERVER
+    if isinstance(err, (ConnectTimeoutError, ReadTimeoutError, TimeoutError)):
+        return ErrorClass.TIMEOUT
+    if "Circuit breaker is open" in str(err):
+        return ErrorClass.CIRCUIT_OPEN
+    return ErrorClass.OTHER
+
+class TraceRecord:
+    # timestamp (s), region id, error class, latency (ms), total tokens
+    FORMAT = struct.Struct("<dHBfI")
+    __slots__ = ("timestamp", "region", "latency_ms", "error_class", "tokens")
+
+    def __init__(self, timestamp: float, region: str, latency_ms: float, error_class: ErrorClass, tokens: int):
+        self.timestamp = timestamp
+        self.region = region
+        self.latency_ms = latency_ms
+        self.error_class = error_class
+        self.tokens = tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "region": self.region,
+            "latency_ms": self.latency_ms,
+            "error_class": self.error_class.name.lower(),
+            "tokens": self.tokens
+        }
+
+# Each flush appends a block: header, region name table, then fixed-size records
+BLOCK_HEADER = struct.Struct("<4sHI")
+BLOCK_MAGIC = b"BCTR"
+
+class TraceRecorder:
+    """
+    Records request outcomes into a fixed-size ring buffer of packed records.
+    Unflushed records are appended to the trace file when the buffer fills up
+    or on flush(); without a trace file the buffer just keeps the latest records.
+    record() and submit_flush() only copy the pending records out of the buffer;
+    a single writer thread appends them to the file in order, so the event loop
+    never waits on disk.
+    """
+    def __init__(self, path: str | None = settings.TRACE_FILE, capacity: int = settings.TRACE_BUFFER_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self.record_size = TraceRecord.FORMAT.size
+        self._buffer = bytearray(capacity * self.record_size)
+        self._regions: Dict[str, int] = {}
+        self._region_names: List[str] = []
+        self._count = 0
+        self._flushed = 0
+        self.dropped_count = 0
+        # Records lost because their block could not be written; only updated by the writer thread
+        self.failed_write_count = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-writer")
+        logger.info(f"Initializing TraceRecorder (path: {path}, capacity: {capacity})")
+
+    def _region_id(self, region: str) -> int:
+        region_id = self._regions.get(region)
+        if region_id is None:
+            region_id = len(self._region_names)
+            self._regions[region] = region_id
+            self._region_names.append(region)
+        return region_id
+
+    def record(self, timestamp: float, region: str, latency_ms: float, error_class: ErrorClass, tokens: int = 0):
+        if self.path and self._count - self._flushed >= self.capacity:
+            self.submit_flush()
+        if self._count - self._flushed >= self.capacity:
+            # Oldest unflushed record is about to be overwritten
+            self._flushed += 1
+            self.dropped_count += 1
+        offset = (self._count % self.capacity) * self.record_size
+        TraceRecord.FORMAT.pack_into(
+            self._buffer, offset,
+            timestamp, self._region_id(region), int(error_class), latency_ms, tokens
+        )
+        self._count += 1
+
+    def _pending_slice(self) -> bytes:
+        start = self._flushed % self.capacity
+        end = self._count % self.capacity
+        pending = self._count - self._flushed
+        if pending == 0:
+            return b""
+        if start < end:
+            return bytes(self._buffer[start * self.record_size:end * self.record_size])
+        return bytes(self._buffer[start * self.record_size:]) + bytes(self._buffer[:end * self.record_size])
+
+    def _take_block(self) -> Tuple[bytes, int]:
+        """Copy unflushed records out as a trace file block, freeing their slots in the buffer"""
+        pending = self._count - self._flushed
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, len(self._region_names), pending)]
+        for name in self._region_names:
+            encoded = name.encode("utf-8")
+            parts.append(struct.pack("<B", len(encoded)) + encoded)
+        parts.append(self._pending_slice())
+        self._flushed = self._count
+        return b"".join(parts), pending
+
+    def _write_block(self, block: bytes, pending: int) -> int:
+        try:
+            with open(self.path, "ab") as trace_file:
+                trace_file.write(block)
+        except OSError as e:
+            self.failed_write_count += pending
+            logger.warning(f"Failed to flush trace to {self.path}: {str(e)}")
+            return 0
+        logger.info(f"Flushed {pending} trace records to {self.path}")
+        return pending
+
+    def submit_flush(self) -> Future:
+        """Hand unflushed records to the writer thread; the future gives how many were written"""
+        pending = self._count - self._flushed
+        if not self.path or pending == 0:
+            done = Future()
+            done.set_result(0)
+            return done
+        return self._writer.submit(self._write_block, *self._take_block())
+
+    def flush(self) -> int:
+        """Append unflushed records to the trace file, blocking until they are written"""
+        return self.submit_flush().result()
+
+    def get_recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        available = min(self._count, self.capacity, limit)
+        records = []
+        for position in range(self._count - available, self._count):
+            offset = (position % self.capacity) * self.record_size
+            timestamp, region_id, error_class, latency_ms, tokens = TraceRecord.FORMAT.unpack_from(self._buffer, offset)
+            records.append(TraceRecord(
+                timestamp, self._region_names[region_id], latency_ms, ErrorClass(error_class), tokens
+            ).to_dict())
+        return records
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "recorded_count": self._count,
+            "unflushed_count": self._count - self._flushed,
+            "dropped_count": self.dropped_count,
+            "failed_write_count": self.failed_write_count
+        }
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """Read all records from a trace file written by TraceRecorder"""
+    record_format = TraceRecord.FORMAT
+    with open(path, "rb") as trace_file:
+        data = trace_file.read()
+    offset = 0
+    while offset < len(data):
+        magic, region_count, record_count = BLOCK_HEADER.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Invalid trace block at offset {offset} in {path}")
+        offset += BLOCK_HEADER.size
+        region_names = []
+        for _ in range(region_count):
+            length = data[offset]
+            region_names.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+        for timestamp, region_id, error_class, latency_ms, tokens in record_format.iter_unpack(
+            data[offset:offset + record_count * record_format.size]
+        ):
+            yield TraceRecord(timestamp, region_names[region_id], latency_ms, ErrorClass(error_class), tokens)
+        offset += record_count * record_format.size
+
+trace_recorder = TraceRecorder()
@@ -0,0 +1,289 @@
+"""
+Offline routing simulator.
+
+Replays recorded traces or synthetic outage scenarios through the real
+LoadBalancer and CircuitBreaker classes on a virtual clock, and reports
+availability, extra latency and wasted calls for each configuration.
+
+    python -m app.testing.simulator --scenario regional-outage
+    python -m app.testing.simulator --trace trace.bin --recovery-timeouts 10,30,60
+"""
+from typing import Dict, Any, List, Tuple
+from bisect import bisect_right
+from collections import deque
+import argparse
+import heapq
+import itertools
+import logging
+import random
+import time
+from app.core.config import settings
+from app.services.circuit_breaker import RegionalCircuitBreaker
+from app.services.load_balancer import LoadBalancer, LoadBalancerStrategy
+from app.services.trace_recorder import ErrorClass, LOCAL_REJECTIONS, read_trace
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+class SimulatedEndpoint:
+    def __init__(self, name: str):
+        # Trace regions are endpoint names (region@account), so failover can group accounts by region
+        self.name = name
+        self.region = name.split("@")[0]
+
+class TraceModel:
+    """Region behaviour taken from recorded outcomes: the latest outcome at or before the request time"""
+    def __init__(self, records):
+        self.timelines: Dict[str, Tuple[List[float], List[Tuple[float, ErrorClass]]]] = {}
+        self.arrivals: List[float] = []
+        by_region: Dict[str, List] = {}
+        for record in records:
+            # Every request is replayed, but local rejections say nothing about the region itself
+            self.arrivals.append(record.timestamp)
+            if record.error_class not in LOCAL_REJECTIONS:
+                by_region.setdefault(record.region, []).append(record)
+        for region, region_records in by_region.items():
+            region_records.sort(key=lambda r: r.timestamp)
+            self.timelines[region] = (
+                [r.timestamp for r in region_records],
+                [(r.latency_ms / 1000, r.error_class) for r in region_records]
+            )
+        self.arrivals.sort()
+
+    @property
+    def regions(self) -> List[str]:
+        return list(self.timelines)
+
+    def reset(self):
+        pass
+
+    def outcome(self, region: str, now: float) -> Tuple[float, ErrorClass]:
+        timestamps, outcomes = self.timelines[region]
+        return outcomes[max(0, bisect_right(timestamps, now) - 1)]
+
+class ScenarioModel:
+    """Synthetic region behaviour: healthy latency, windows of failures and per-endpoint quotas"""
+    def __init__(
+        self,
+        regions: List[str],
+        duration: float,
+        rate: float,
+        outages: Dict[str, List[Tuple[float, float, float]]],
+        latency: float = 1.0,
+        failure_latency: float = 0.2,
+        seed: int = 0,
+        quotas: Dict[str, float] | None = None
+    ):
+        self.regions = regions
+        self.latency = latency
+        self.failure_latency = failure_latency
+        # region -> [(start, end, failure probability)]
+        self.outages = outages
+        # region -> calls accepted per second; calls above it are throttled
+        self.quotas = quotas or {}
+        self.seed = seed
+        interval = 1.0 / rate
+        self.arrivals = [i * interval for i in range(int(duration * rate))]
+        self.reset()
+
+    def reset(self):
+        """Start over so every configuration in a sweep sees the same failures"""
+        self._random = random.Random(self.seed)
+        self._accepted: Dict[str, deque] = {region: deque() for region in self.quotas}
+
+    def outcome(self, region: str, now: float) -> Tuple[float, ErrorClass]:
+        for start, end, failure_rate in self.outages.get(region, ()):
+            if start <= now < end and self._random.random() < failure_rate:
+                return self.failure_latency, ErrorClass.SERVER
+        if region in self.quotas:
+            accepted = self._accepted[region]
+            while accepted and accepted[0] <= now - 1.0:
+                accepted.popleft()
+            if len(accepted) >= self.quotas[region]:
+                return self.failure_latency, ErrorClass.THROTTLED
+            accepted.append(now)
+        return self.latency, ErrorClass.NONE
+
+def build_scenario(name: str, region_weights: Dict[str, int], duration: float, rate: float, seed: int) -> ScenarioModel:
+    regions = list(region_weights)
+    # The region failover prefers: highest weight, first listed on ties
+    primary = max(regions, key=lambda region: region_weights[region])
+    quotas = None
+    if name == "regional-outage":
+        outages = {primary: [(duration * 0.2, duration * 0.6, 1.0)]}
+    elif name == "flapping":
+        outages = {primary: [(start, start + 20, 1.0) for start in range(0, int(duration), 40)]}
+    elif name == "brownout":
+        outages = {primary: [(0, duration, 0.5)]}
+    elif name == "multi-region-outage":
+        outages = {region: [(duration * 0.3, duration * 0.5, 1.0)] for region in regions}
+    elif name == "throttling":
+        # Every endpoint can take a little more than an even share of the load
+        outages = {}
+        quotas = {region: rate * 1.25 / len(regions) for region in regions}
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+    return ScenarioModel(regions, duration, rate, outages, seed=seed, quotas=quotas)
+
+SCENARIOS = ["regional-outage", "flapping", "brownout", "multi-region-outage", "throttling"]
+
+def simulate(model, region_weights: Dict[str, int], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Run every arrival in the model through a fresh LoadBalancer and CircuitBreakers"""
+    model.reset()
+    clock = VirtualClock()
+    circuit_breaker = RegionalCircuitBreaker(
+        failure_threshold=config["failure_threshold"],
+        recovery_timeout=config["recovery_timeout"],
+        success_threshold=config["success_threshold"],
+        clock=clock
+    )
+    load_balancer = LoadBalancer(strategy=config["strategy"], circuit_breaker=circuit_breaker, clock=clock)
+    for region in model.regions:
+        load_balancer.add_endpoint(SimulatedEndpoint(region), weight=region_weights.get(region, 1))
+    throttle_cooldown = config.get("throttle_cooldown", settings.AWS_THROTTLE_COOLDOWN)
+
+    # Completion events: (finish time, sequence, endpoint, error class)
+    completions: List[Tuple[float, int, SimulatedEndpoint, ErrorClass]] = []
+    successes = 0
+    rejected = 0
+    wasted_calls = 0
+    throttled = 0
+    success_latency = 0.0
+    failure_latency = 0.0
+    latencies: List[float] = []
+
+    for sequence, arrival in enumerate(model.arrivals):
+        while completions and completions[0][0] <= arrival:
+            finished_at, _, endpoint, error_class = heapq.heappop(completions)
+            clock.now = finished_at
+            breaker = circuit_breaker.get_breaker(endpoint.name)
+            if error_class == ErrorClass.NONE:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if error_class == ErrorClass.THROTTLED:
+                # Same as live traffic: only this (account, region) endpoint sits out the cooldown
+                load_balancer.mark_endpoint_throttled(endpoint, throttle_cooldown)
+        clock.now = arrival
+
+        try:
+            endpoint = load_balancer.get_next_endpoint()
+        except Exception:
+            rejected += 1
+            continue
+
+        latency, error_class = model.outcome(endpoint.name, arrival)
+        heapq.heappush(completions, (arrival + latency, sequence, endpoint, error_class))
+        if error_class == ErrorClass.NONE:
+            successes += 1
+            success_latency += latency
+            latencies.append(latency)
+        else:
+            wasted_calls += 1
+            failure_latency += latency
+            if error_class == ErrorClass.THROTTLED:
+                throttled += 1
+
+    total = len(model.arrivals)
+    latencies.sort()
+    return {
+        **config,
+        "requests": total,
+        "availability": successes / total if total else 0.0,
+        "wasted_calls": wasted_calls,
+        "throttled": throttled,
+        "rejected": rejected,
+        "mean_latency_ms": success_latency / successes * 1000 if successes else 0.0,
+        "p99_latency_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        # Time spent on calls that failed, spread over every request
+        "extra_latency_ms": failure_latency / total * 1000 if total else 0.0
+    }
+
+def run_sweep(model, region_weights: Dict[str, int], configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Per-request logging from the balancer and breakers would dominate the run time
+    service_logger = logging.getLogger("app.services")
+    previous_level = service_logger.level
+    service_logger.setLevel(logging.ERROR)
+    try:
+        results = []
+        for config in configs:
+            started_at = time.perf_counter()
+            result = simulate(model, region_weights, config)
+            elapsed = time.perf_counter() - started_at
+            result["requests_per_second"] = result["requests"] / elapsed if elapsed else 0.0
+            results.append(result)
+        return results
+    finally:
+        service_logger.setLevel(previous_level)
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',')]
+
+def _float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate load balancer and circuit breaker configurations")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="Trace file written by TraceRecorder")
+    source.add_argument("--scenario", choices=SCENARIOS, help="Synthetic outage scenario")
+    parser.add_argument("--regions", default="ap-southeast-1:1,us-east-1:1",
+                        help="Regions and weights (region:weight, comma-separated)")
+    parser.add_argument("--duration", type=float, default=600, help="Scenario length in seconds")
+    parser.add_argument("--rate", type=float, default=100, help="Scenario requests per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategies", default=",".join(s.value for s in LoadBalancerStrategy))
+    parser.add_argument("--failure-thresholds", type=_int_list, default=[3])
+    parser.add_argument("--recovery-timeouts", type=_int_list, default=[30])
+    parser.add_argument("--success-thresholds", type=_int_list, default=[2])
+    parser.add_argument("--throttle-cooldowns", type=_float_list, default=[settings.AWS_THROTTLE_COOLDOWN])
+    args = parser.parse_args()
+
+    region_weights = {}
+    for entry in args.regions.split(','):
+        region, weight = entry.split(':')
+        region_weights[region.strip()] = int(weight)
+
+    random.seed(args.seed)
+    if args.trace:
+        model = TraceModel(read_trace(args.trace))
+    else:
+        model = build_scenario(args.scenario, region_weights, args.duration, args.rate, args.seed)
+
+    configs = [
+        {
+            "strategy": strategy,
+            "failure_threshold": failure_threshold,
+            "recovery_timeout": recovery_timeout,
+            "success_threshold": success_threshold,
+            "throttle_cooldown": throttle_cooldown
+        }
+        for strategy, failure_threshold, recovery_timeout, success_threshold, throttle_cooldown in itertools.product(
+            args.strategies.split(','),
+            args.failure_thresholds,
+            args.recovery_timeouts,
+            args.success_thresholds,
+            args.throttle_cooldowns
+        )
+    ]
+
+    header = (
+        f"{'strategy':<12} {'fail':>4} {'recov':>5} {'succ':>4} {'cool':>5} {'availability':>12} "
+        f"{'wasted':>8} {'throttled':>9} {'rejected':>8} {'mean_ms':>9} {'p99_ms':>9} {'extra_ms':>9} {'req/s':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in run_sweep(model, region_weights, configs):
+        print(
+            f"{result['strategy']:<12} {result['failure_threshold']:>4} {result['recovery_timeout']:>5} "
+            f"{result['success_threshold']:>4} {result['throttle_cooldown']:>5g} {result['availability']:>12.4%} "
+            f"{result['wasted_calls']:>8} {result['throttled']:>9} {result['rejected']:>8} {result['mean_latency_ms']:>9.1f} {result['p99_latency_ms']:>9.1f} "
+            f"{result['extra_latency_ms']:>9.2f} {result['requests_per_second']:>10.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,16 @@
+import asyncio
 from fastapi import APIRouter
 from app.services.bedrock_service import bedrock_service, region_mapper
 from app.services.circuit_breaker import regional_circuit_breaker
+from app.services.trace_recorder import trace_recorder
+from app.services.credential_pool import credential_pool
 
 test_router = APIRouter(prefix="/test", tags=["testing"])
 
 @test_router.get("/load-balancer-status")
 async def get_load_balancer_status():
     try:
-        endpoints_status = [
-            {
-                "region": ep["endpoint"].region,
-                "healthy": ep["healthy"],
-                "weight": ep["weight"]
-            }
-            for ep in bedrock_service.load_balancer.endpoints
-        ]
-        
-        return {
-            "strategy": bedrock_service.load_balancer.strategy.value,
-            "endpoints": endpoints_status
-        }
+        return bedrock_service.load_balancer.get_status()
     except Exception as e:
         return {"error": str(e)}
 
@@ -27,10 +18,36 @@ async def get_load_balancer_status():
 async def get_circuit_breaker_status():
     return regional_circuit_breaker.get_status()
 
+@test_router.get("/scheduler-status")
+async def get_scheduler_status():
+    return bedrock_service.scheduler.get_status()
+
+@test_router.get("/trace-status")
+async def get_trace_status(limit: int = 20):
+    return {
+        **trace_recorder.get_status(),
+        "recent": trace_recorder.get_recent(limit)
+    }
+
+@test_router.post("/flush-trace")
+async def flush_trace():
+    """Write buffered trace records to the trace file"""
+    written = await asyncio.wrap_future(trace_recorder.submit_flush())
+    return {"message": f"Flushed {written} trace records"}
+
+@test_router.get("/credential-pool-status")
+async def get_credential_pool_status():
+    return credential_pool.get_status()
+
 @test_router.post("/set-region-mapping")
-async def set_region_mapping(source_region: str, target_region: str):
-    """Set a region mapping for testing purposes"""
-    region_mapper.set_mapping(source_region, target_region)
+async def set_region_mapping(source_region: str, target_region: str, target_account: str | None = None):
+    """Set a region mapping for testing purposes, optionally into another account"""
+    try:
+        region_mapper.set_mapping(source_region, target_region, target_account)
+    except Exception as e:
+        return {"error": str(e)}
+    if target_account:
+        return {"message": f"Mapped {source_region} to {target_region} in account {target_account}"}
     return {"message": f"Mapped {source_region} to {target_region}"}
 
 @test_router.delete("/clear-region-mapping")
@@ -1,15 +1,17 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from app.services.bedrock_service import bedrock_service
 from app.testing.test_routes import test_router
 from app.core.config import settings
 from app.core.logger import logger
+from app.services.trace_recorder import trace_recorder
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"Starting server with load balancer strategy: {settings.LOAD_BALANCER_STRATEGY}")
     yield
+    trace_recorder.flush()
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(test_router)
@@ -17,22 +19,40 @@ app.include_router(test_router)
 class Message(BaseModel):
     content: str
     system_prompt: str | None = None
+    priority: str | None = None
+
+    @field_validator('priority')
+    @classmethod
+    def check_priority(cls, value: str | None) -> str | None:
+        if value is not None and value not in settings.SCHEDULER_PRIORITY_WEIGHTS:
+            raise ValueError(f"priority must be one of {list(settings.SCHEDULER_PRIORITY_WEIGHTS)}")
+        return value
 
 @app.post("/chat")
 async def chat(message: Message):
     try:
         response = await bedrock_service.generate_conversation(
             message_content=message.content,
-            system_prompt=message.system_prompt
+            system_prompt=message.system_prompt,
+            priority=message.priority
         )
         
         return {
             "response": response['output']['message']['content'][0]['text'],
             "region": response['region'],
+            "account": response['account'],
             "token_usage": response['usage'],
             "stop_reason": response['stopReason'],
             "status": "success"
         }
+    except HTTPException as e:
+        # Client errors are passed through unchanged
+        if e.status_code < 500:
+            raise
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service temporarily unavailable. Error: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=503, 
@@ -0,0 +1,17 @@
+#!/bin/bash
+
+# Colors for output
+GREEN='\033[0;32m'
+BLUE='\033[0;34m'
+NC='\033[0m'
+
+echo -e "${BLUE}Scheduler Status Monitor${NC}"
+echo "========================"
+
+while true; do
+    clear
+    echo -e "${GREEN}$(date)${NC}"
+    echo "Scheduler Status:"
+    curl -s http://localhost:8000/test/scheduler-status | jq
+    sleep 1
+done
@@ -0,0 +1,5 @@
+import os
+
+# BedrockService is created at import time and needs a region list
+os.environ.setdefault('AWS_REGIONS', 'us-east-1')
+os.environ.setdefault('AWS_REGION_WEIGHTS', '1')
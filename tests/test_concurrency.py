@@ -0,0 +1,248 @@
+"""
+Race tests for the circuit breaker and load balancer core.
+
+Each test parks one thread inside the critical section (in the injected
+clock, the breaker constructor or the rotation sequence) until a second
+thread has run, so the interleaving is forced rather than left to the
+thread scheduler. Run the contention benchmark with:
+
+    python -m tests.test_concurrency
+"""
+import logging
+import threading
+import time
+from app.services import circuit_breaker as circuit_breaker_module
+from app.services.circuit_breaker import CircuitBreaker, CircuitState, RegionalCircuitBreaker
+from app.services.load_balancer import LoadBalancer
+
+TIMEOUT = 2
+
+class Endpoint:
+    def __init__(self, region):
+        self.region = region
+        self.name = region
+
+class BlockingClock:
+    """Clock that, once armed, parks its caller until released"""
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.armed = False
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self) -> float:
+        if self.armed:
+            self.armed = False
+            self.entered.set()
+            self.release.wait(TIMEOUT)
+        return self.now
+
+class RendezvousClock:
+    """Clock that, once armed, makes its first two callers wait for each other"""
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.armed = False
+        self.barrier = threading.Barrier(2, timeout=0.5)
+        self._calls = 0
+
+    def __call__(self) -> float:
+        if self.armed:
+            self._calls += 1
+            if self._calls <= 2:
+                try:
+                    self.barrier.wait()
+                except threading.BrokenBarrierError:
+                    # Only one caller got this far, which is what a correct lock guarantees
+                    pass
+        return self.now
+
+def run_threads(target, threads):
+    errors = []
+
+    def worker(index):
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert not errors, errors
+
+def test_get_breaker_creates_one_breaker_per_region(monkeypatch):
+    created = []
+    barrier = threading.Barrier(2, timeout=0.5)
+
+    class SlowCircuitBreaker(CircuitBreaker):
+        def __init__(self, **options):
+            created.append(self)
+            try:
+                # Hold construction open until a second thread is also constructing
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            super().__init__(**options)
+
+    monkeypatch.setattr(circuit_breaker_module, "CircuitBreaker", SlowCircuitBreaker)
+    regional = RegionalCircuitBreaker()
+    seen = []
+
+    run_threads(lambda index: seen.append(regional.get_breaker("us-east-1")), 2)
+    assert len(created) == 1
+    assert seen[0] is seen[1] is regional.breakers["us-east-1"]
+
+def test_half_open_transition_happens_once():
+    clock = RendezvousClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, success_threshold=2, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    clock.armed = True
+
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage())
+    breaker_logger = logging.getLogger("app.services.circuit_breaker")
+    previous_level = breaker_logger.level
+    breaker_logger.addHandler(handler)
+    breaker_logger.setLevel(logging.INFO)
+    try:
+        run_threads(lambda index: breaker.can_execute(), 2)
+    finally:
+        breaker_logger.removeHandler(handler)
+        breaker_logger.setLevel(previous_level)
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert messages.count("Circuit breaker entering half-open state") == 1
+
+def test_failure_racing_with_close_is_not_lost():
+    clock = BlockingClock()
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10, success_threshold=1, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.can_execute()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # The failure is recorded while the closing success runs in between
+    clock.armed = True
+    failing = threading.Thread(target=breaker.record_failure)
+    failing.start()
+    assert clock.entered.wait(TIMEOUT)
+    breaker.record_success()
+    clock.release.set()
+    failing.join()
+
+    # Either order is fine: success then failure, or failure then success
+    assert (breaker.state, breaker.failure_count) in {
+        (CircuitState.CLOSED, 1),
+        (CircuitState.OPEN, 0)
+    }
+
+def test_status_read_during_transition_is_consistent():
+    clock = BlockingClock()
+    regional = RegionalCircuitBreaker(failure_threshold=3, recovery_timeout=10, success_threshold=2, clock=clock)
+    breaker = regional.get_breaker("us-east-1")
+    breaker.record_failure()
+    breaker.record_failure()
+
+    # Read the status while the opening failure is half way through
+    clock.armed = True
+    failing = threading.Thread(target=breaker.record_failure)
+    failing.start()
+    assert clock.entered.wait(TIMEOUT)
+    status = regional.get_status()["us-east-1"]
+    clock.release.set()
+    failing.join()
+
+    if status["state"] == CircuitState.CLOSED.value:
+        assert status["failure_count"] < 3
+    assert regional.get_status()["us-east-1"]["state"] == CircuitState.OPEN.value
+
+def test_round_robin_rotation_is_not_skipped():
+    barrier = threading.Barrier(2, timeout=0.5)
+
+    class RendezvousSequence(list):
+        def __getitem__(self, index):
+            # Both selections look up the sequence at the same time
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            return super().__getitem__(index)
+
+    class RendezvousLoadBalancer(LoadBalancer):
+        def _get_weighted_sequence(self, *args):
+            return RendezvousSequence(super()._get_weighted_sequence(*args))
+
+    load_balancer = RendezvousLoadBalancer(strategy="round-robin", circuit_breaker=RegionalCircuitBreaker())
+    for region in ("us-east-1", "us-west-2"):
+        load_balancer.add_endpoint(Endpoint(region))
+    selections = []
+
+    run_threads(lambda index: selections.append(load_balancer.get_next_endpoint().region), 2)
+    assert sorted(selections) == ["us-east-1", "us-west-2"]
+
+def test_capacity_read_does_not_move_breaker_state():
+    clock = BlockingClock()
+    regional = RegionalCircuitBreaker(failure_threshold=1, recovery_timeout=10, success_threshold=2, clock=clock)
+    load_balancer = LoadBalancer(strategy="round-robin", circuit_breaker=regional)
+    load_balancer.add_endpoint(Endpoint("us-east-1"))
+    regional.get_breaker("us-east-1").record_failure()
+
+    assert load_balancer.get_region_capacity(4) == {"us-east-1": 0}
+    clock.now = 10.0
+    # Past the recovery timeout the endpoint offers a probe slot, but only selection moves it to half-open
+    assert load_balancer.get_region_capacity(4) == {"us-east-1": 1}
+    assert regional.get_status()["us-east-1"]["state"] == CircuitState.OPEN.value
+    load_balancer.get_next_endpoint()
+    assert regional.get_status()["us-east-1"]["state"] == CircuitState.HALF_OPEN.value
+
+def test_endpoint_updates_do_not_modify_snapshots():
+    load_balancer = LoadBalancer(strategy="round-robin", circuit_breaker=RegionalCircuitBreaker())
+    endpoint = Endpoint("us-east-1")
+    load_balancer.add_endpoint(endpoint)
+    snapshot = load_balancer.endpoints
+
+    load_balancer.mark_endpoint_unhealthy(endpoint)
+    load_balancer.mark_endpoint_throttled(endpoint, 5)
+    load_balancer.mark_endpoint_throttled(endpoint, 5)
+
+    assert snapshot[0]["healthy"] and snapshot[0]["throttle_count"] == 0
+    assert not load_balancer.endpoints[0]["healthy"]
+    assert load_balancer.endpoints[0]["throttle_count"] == 2
+
+def benchmark_contention(threads: int, iterations: int = 20000) -> float:
+    """Selections plus outcome recordings per second across all threads"""
+    regional = RegionalCircuitBreaker(failure_threshold=3, recovery_timeout=1, success_threshold=2)
+    load_balancer = LoadBalancer(strategy="round-robin", circuit_breaker=regional)
+    for region in ("ap-southeast-1", "us-east-1", "us-west-2"):
+        load_balancer.add_endpoint(Endpoint(region))
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        barrier.wait()
+        for i in range(iterations):
+            try:
+                endpoint = load_balancer.get_next_endpoint()
+            except Exception:
+                continue
+            breaker = regional.get_breaker(endpoint.name)
+            if i % 50:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            regional.get_status()
+
+    started_at = time.perf_counter()
+    run_threads(worker, threads)
+    return threads * iterations / (time.perf_counter() - started_at)
+
+if __name__ == "__main__":
+    logging.getLogger("app.services").setLevel(logging.ERROR)
+    print("Contention Benchmark")
+    print("====================")
+    for threads in (1, 2, 4, 8, 16):
+        print(f"{threads:>2} threads: {benchmark_contention(threads):>10.0f} ops/s")
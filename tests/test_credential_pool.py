@@ -0,0 +1,110 @@
+import pytest
+from app.core.config import Settings
+from app.services import bedrock_service as bedrock_service_module
+from app.services.bedrock_service import RegionMapper
+from app.services.circuit_breaker import RegionalCircuitBreaker
+from app.services.credential_pool import CredentialPool, endpoint_name
+from app.services.load_balancer import LoadBalancer
+
+class Endpoint:
+    def __init__(self, name):
+        self.region = name.split("@")[0]
+        self.name = name
+
+def test_single_key_pair_is_the_default_account(monkeypatch):
+    monkeypatch.delenv("AWS_ACCOUNTS", raising=False)
+    accounts = Settings().AWS_ACCOUNTS_CONFIG
+    assert [account["name"] for account in accounts] == ["default"]
+    assert accounts[0]["access_key_id"] == Settings.AWS_ACCESS_KEY_ID
+
+def test_accounts_are_read_from_prefixed_variables(monkeypatch):
+    monkeypatch.setenv("AWS_ACCOUNTS", "prod, team-b")
+    monkeypatch.setenv("AWS_ACCOUNT_PROD_ACCESS_KEY_ID", "AKIAPROD")
+    monkeypatch.setenv("AWS_ACCOUNT_PROD_SECRET_ACCESS_KEY", "prod-secret")
+    monkeypatch.setenv("AWS_ACCOUNT_TEAM_B_ACCESS_KEY_ID", "AKIATEAMB")
+    monkeypatch.setenv("AWS_ACCOUNT_TEAM_B_SECRET_ACCESS_KEY", "team-b-secret")
+    assert Settings().AWS_ACCOUNTS_CONFIG == [
+        {"name": "prod", "access_key_id": "AKIAPROD", "secret_access_key": "prod-secret"},
+        {"name": "team-b", "access_key_id": "AKIATEAMB", "secret_access_key": "team-b-secret"}
+    ]
+
+def test_account_without_keys_is_rejected(monkeypatch):
+    monkeypatch.setenv("AWS_ACCOUNTS", "prod")
+    monkeypatch.setenv("AWS_ACCOUNT_PROD_ACCESS_KEY_ID", "AKIAPROD")
+    monkeypatch.delenv("AWS_ACCOUNT_PROD_SECRET_ACCESS_KEY", raising=False)
+    with pytest.raises(ValueError, match="AWS_ACCOUNT_PROD_SECRET_ACCESS_KEY"):
+        Settings().AWS_ACCOUNTS_CONFIG
+
+def test_endpoint_name():
+    # The default account keeps plain region names so existing breaker keys stay valid
+    assert endpoint_name("default", "us-east-1") == "us-east-1"
+    assert endpoint_name("prod", "us-east-1") == "us-east-1@prod"
+
+def test_credential_pool_masks_keys():
+    pool = CredentialPool([{"name": "prod", "access_key_id": "AKIAPROD1234", "secret_access_key": "secret"}])
+    assert pool.get_status() == {"accounts": [{"name": "prod", "access_key_id": "...1234"}]}
+    with pytest.raises(Exception, match="Unknown account: other"):
+        pool.get_account("other")
+
+def test_endpoint_name_mapping_takes_precedence(monkeypatch):
+    monkeypatch.setattr(bedrock_service_module, "credential_pool", CredentialPool([
+        {"name": "default", "access_key_id": "AKIADEFAULT", "secret_access_key": "secret"},
+        {"name": "prod", "access_key_id": "AKIAPROD", "secret_access_key": "secret"}
+    ]))
+    mapper = RegionMapper()
+    mapper.set_mapping("us-east-1", "us-west-2", "prod")
+    mapper.set_mapping("us-east-1@prod", "eu-west-1", "default")
+
+    assert mapper.get_effective_account("default", "us-east-1", "us-east-1") == "prod"
+    assert mapper.get_effective_region("us-east-1", "us-east-1") == "us-west-2"
+    assert mapper.get_effective_account("prod", "us-east-1", "us-east-1@prod") == "default"
+    assert mapper.get_effective_region("us-east-1", "us-east-1@prod") == "eu-west-1"
+    assert mapper.get_effective_account("prod", "ap-southeast-1", "ap-southeast-1@prod") == "prod"
+
+    # Remapping without an account drops the earlier account move
+    mapper.set_mapping("us-east-1", "us-west-2")
+    assert mapper.get_effective_account("default", "us-east-1", "us-east-1") == "default"
+
+def test_mapping_to_unknown_account_is_not_stored(monkeypatch):
+    monkeypatch.setattr(bedrock_service_module, "credential_pool", CredentialPool([
+        {"name": "default", "access_key_id": "AKIADEFAULT", "secret_access_key": "secret"}
+    ]))
+    mapper = RegionMapper()
+    with pytest.raises(Exception, match="Unknown account: prod"):
+        mapper.set_mapping("us-east-1", "us-west-2", "prod")
+    assert mapper.mappings == {}
+    assert mapper.account_mappings == {}
+
+def test_throttled_endpoint_is_skipped_until_cooldown_passes():
+    now = [1000.0]
+    load_balancer = LoadBalancer(
+        strategy="round-robin", circuit_breaker=RegionalCircuitBreaker(), clock=lambda: now[0]
+    )
+    throttled = Endpoint("us-east-1@prod")
+    load_balancer.add_endpoint(throttled)
+    load_balancer.add_endpoint(Endpoint("us-east-1"))
+
+    load_balancer.mark_endpoint_throttled(throttled, 5)
+    entry = load_balancer.endpoints[0]
+    assert not load_balancer._is_endpoint_available(entry)
+    assert {load_balancer.get_next_endpoint().name for _ in range(4)} == {"us-east-1"}
+    assert load_balancer.get_region_capacity(4)["us-east-1@prod"] == 0
+
+    now[0] += 5
+    assert load_balancer._is_endpoint_available(entry)
+    assert load_balancer.get_region_capacity(4)["us-east-1@prod"] == 4
+
+def test_failover_rotates_among_accounts_of_preferred_region():
+    load_balancer = LoadBalancer(strategy="failover", circuit_breaker=RegionalCircuitBreaker())
+    for name, weight in (("us-east-1", 2), ("us-east-1@prod", 2), ("us-west-2", 1), ("us-west-2@prod", 1)):
+        load_balancer.add_endpoint(Endpoint(name), weight=weight)
+
+    assert [load_balancer.get_next_endpoint().name for _ in range(4)] == [
+        "us-east-1", "us-east-1@prod", "us-east-1", "us-east-1@prod"
+    ]
+    # A saturated or throttled account drops out of the rotation
+    assert {load_balancer.get_next_endpoint(exclude={"us-east-1"}).name for _ in range(3)} == {"us-east-1@prod"}
+    # The next region is only used when every account of the preferred one is unavailable
+    assert {
+        load_balancer.get_next_endpoint(exclude={"us-east-1", "us-east-1@prod"}).name for _ in range(4)
+    } == {"us-west-2", "us-west-2@prod"}
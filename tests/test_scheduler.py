@@ -0,0 +1,231 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from main import Message
+from app.core.config import Settings
+from app.services import bedrock_service as bedrock_service_module
+from app.services.bedrock_service import bedrock_service
+from app.services.scheduler import RequestScheduler
+
+def test_unknown_priority_is_rejected_by_request_model():
+    assert Message(content="hello", priority="batch").priority == "batch"
+    with pytest.raises(ValidationError):
+        Message(content="hello", priority="urgent")
+
+def test_unknown_priority_is_a_client_error():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(bedrock_service.generate_conversation("hello", priority="urgent"))
+    assert error.value.status_code == 400
+
+class StubLoadBalancer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+
+    def get_region_capacity(self, concurrency_per_region):
+        return dict(self.capacity)
+
+def make_scheduler(capacity, **options):
+    options = {
+        "priority_weights": {"interactive": 4, "batch": 1},
+        "default_priority": "interactive",
+        "max_queue_length": 10,
+        "queue_timeout": 5.0,
+        "concurrency_per_region": 1,
+        "poll_interval": 5.0,
+        **options
+    }
+    return RequestScheduler(StubLoadBalancer(capacity), **options)
+
+def test_queued_requests_are_admitted_by_weight():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 1})
+        order = []
+
+        async def job(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+                await asyncio.sleep(0)
+
+        holder = await scheduler.acquire("batch")
+        tasks = [asyncio.create_task(job("batch")) for _ in range(5)]
+        tasks += [asyncio.create_task(job("interactive")) for _ in range(5)]
+        await asyncio.sleep(0)
+        scheduler._release(holder)
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(run())
+    assert order[:5].count("interactive") == 4
+    assert order[-3:] == ["batch", "batch", "batch"]
+
+def test_full_queue_sheds_request():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 1}, max_queue_length=1)
+        await scheduler.acquire("batch")
+        queued = asyncio.create_task(scheduler.acquire("batch"))
+        await asyncio.sleep(0)
+        with pytest.raises(Exception, match="Queue full for priority batch"):
+            await scheduler.acquire("batch")
+        queued.cancel()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.classes["batch"].shed_queue_full == 1
+
+def test_queue_timeout_sheds_request():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 1}, queue_timeout=0.05, poll_interval=0.01)
+        await scheduler.acquire()
+        with pytest.raises(Exception, match="Queue wait time exceeded"):
+            await scheduler.acquire()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.classes["interactive"].shed_timeout == 1
+    assert len(scheduler.classes["interactive"].queue) == 0
+
+def test_queue_limits_are_per_class():
+    async def run():
+        scheduler = make_scheduler(
+            {"us-east-1": 1},
+            max_queue_length={"interactive": 1, "batch": 2},
+            queue_timeout={"interactive": 0.05, "batch": 5.0},
+            poll_interval=0.01
+        )
+        await scheduler.acquire("batch")
+        batch = [asyncio.create_task(scheduler.acquire("batch")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Exception, match="Queue wait time exceeded for priority interactive"):
+            await scheduler.acquire("interactive")
+        # Batch requests are still within their own, longer wait limit
+        assert not any(task.done() for task in batch)
+        for task in batch:
+            task.cancel()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.classes["interactive"].shed_timeout == 1
+    assert scheduler.classes["batch"].shed_timeout == 0
+    assert scheduler.get_status()["classes"]["batch"]["max_queue_length"] == 2
+
+def test_shed_requests_are_not_charged_to_their_class():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 1}, queue_timeout=0.02, poll_interval=0.01)
+        holder = await scheduler.acquire("interactive")
+        for _ in range(3):
+            with pytest.raises(Exception, match="Queue wait time exceeded"):
+                await scheduler.acquire("batch")
+        cancelled = asyncio.create_task(scheduler.acquire("batch"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert scheduler.classes["batch"].last_finish_tag == 0.0
+
+        # The next batch request competes as if the shed ones never queued
+        order = []
+
+        async def job(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+
+        tasks = [asyncio.create_task(job("interactive")), asyncio.create_task(job("batch"))]
+        await asyncio.sleep(0)
+        scheduler._release(holder)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "batch"]
+
+def test_queue_limits_are_parsed_per_class(monkeypatch):
+    monkeypatch.setenv("SCHEDULER_PRIORITY_WEIGHTS", "interactive:4,batch:1")
+    monkeypatch.setenv("SCHEDULER_QUEUE_TIMEOUT", "interactive:2, batch:30")
+    monkeypatch.setenv("SCHEDULER_MAX_QUEUE_LENGTH", "50")
+    assert Settings().SCHEDULER_QUEUE_TIMEOUT == {"interactive": 2.0, "batch": 30.0}
+    assert Settings().SCHEDULER_MAX_QUEUE_LENGTH == {"interactive": 50, "batch": 50}
+
+    monkeypatch.setenv("SCHEDULER_QUEUE_TIMEOUT", "interactive:2")
+    with pytest.raises(ValueError, match="SCHEDULER_QUEUE_TIMEOUT must set a value for every class"):
+        Settings().SCHEDULER_QUEUE_TIMEOUT
+
+def test_cancelled_request_leaves_queue():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 1})
+        holder = await scheduler.acquire()
+        queued = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        assert len(scheduler.classes["interactive"].queue) == 1
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert len(scheduler.classes["interactive"].queue) == 0
+        scheduler._release(holder)
+        return scheduler
+
+    assert asyncio.run(run()).in_flight == 0
+
+def test_recovered_capacity_is_picked_up_by_polling():
+    async def run():
+        scheduler = make_scheduler({"us-east-1": 0}, poll_interval=0.01)
+        queued = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0.03)
+        assert not queued.done()
+        scheduler.load_balancer.capacity = {"us-east-1": 1}
+        await asyncio.wait_for(queued, timeout=1)
+        return scheduler
+
+    assert asyncio.run(run()).in_flight == 1
+
+def test_endpoint_with_all_slots_in_use_is_saturated():
+    scheduler = make_scheduler({"us-east-1": 1, "us-west-2": 4})
+    assert scheduler.get_saturated_endpoints() == set()
+    with scheduler.track_endpoint("us-east-1"):
+        assert scheduler.get_saturated_endpoints() == {"us-east-1"}
+    assert scheduler.get_saturated_endpoints() == set()
+
+class SlowClient:
+    """Stands in for the blocking boto3 client"""
+    def __init__(self, calls):
+        self.calls = calls
+
+    def converse(self, messages, **options):
+        self.calls.append(messages[0]["content"][0]["text"])
+        time.sleep(0.05)
+        return {"usage": {"totalTokens": 1}}
+
+def test_interactive_requests_overtake_queued_batch_requests(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bedrock_service_module.boto3, "client", lambda **options: SlowClient(calls))
+    scheduler = RequestScheduler(
+        bedrock_service.load_balancer,
+        priority_weights={"interactive": 4, "batch": 1},
+        default_priority="interactive",
+        max_queue_length=10,
+        queue_timeout=5.0,
+        concurrency_per_region=2,
+        poll_interval=0.01
+    )
+    monkeypatch.setattr(bedrock_service, "scheduler", scheduler)
+    peak_in_flight = []
+
+    async def run():
+        async def watch():
+            while True:
+                peak_in_flight.append(scheduler.in_flight)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        requests = [bedrock_service.generate_conversation("batch", priority="batch") for _ in range(5)]
+        requests += [bedrock_service.generate_conversation("interactive", priority="interactive") for _ in range(5)]
+        await asyncio.gather(*requests)
+        watcher.cancel()
+
+    asyncio.run(run())
+    # The first two batch requests fill both slots, the rest queue and are admitted by weight
+    assert max(peak_in_flight) == 2
+    assert calls[:2] == ["batch", "batch"]
+    assert calls[2:7].count("interactive") >= 4
+    assert calls[-2:] == ["batch", "batch"]
+    assert scheduler.classes["batch"].max_wait_time > scheduler.classes["interactive"].max_wait_time
@@ -0,0 +1,72 @@
+from app.services.trace_recorder import TraceRecorder, ErrorClass, read_trace
+from app.testing.simulator import ScenarioModel, TraceModel, build_scenario, simulate
+
+CONFIG = {"strategy": "failover", "failure_threshold": 3, "recovery_timeout": 30, "success_threshold": 2}
+WEIGHTS = {"us-east-1": 1, "us-west-2": 1}
+
+def test_healthy_regions_are_fully_available():
+    model = ScenarioModel(list(WEIGHTS), duration=60, rate=10, outages={})
+    result = simulate(model, WEIGHTS, CONFIG)
+    assert result["requests"] == 600
+    assert result["availability"] == 1.0
+    assert result["wasted_calls"] == 0
+
+def test_outage_opens_breaker_and_fails_over():
+    model = build_scenario("regional-outage", WEIGHTS, duration=600, rate=10, seed=0)
+    result = simulate(model, WEIGHTS, CONFIG)
+
+    # Failover prefers the first region, so it takes the outage
+    assert model.outages == {"us-east-1": [(120.0, 360.0, 1.0)]}
+    assert result["wasted_calls"] > 0
+    # Each open cycle costs a few calls, not the whole 240 second outage
+    assert result["wasted_calls"] < 100
+    assert result["availability"] > 0.95
+    assert result["rejected"] == 0
+
+def test_rejected_trace_records_are_replayed(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path, capacity=8)
+    recorder.record(0.0, "us-east-1", 100.0, ErrorClass.NONE)
+    recorder.record(1.0, "", 0.0, ErrorClass.NO_ENDPOINT)
+    recorder.record(2.0, "us-east-1", 100.0, ErrorClass.CIRCUIT_OPEN)
+    recorder.flush()
+
+    model = TraceModel(read_trace(path))
+    assert model.arrivals == [0.0, 1.0, 2.0]
+    assert model.regions == ["us-east-1"]
+    assert simulate(model, {}, CONFIG)["requests"] == 3
+
+def test_failover_spreads_over_accounts_of_preferred_region():
+    weights = {"us-east-1": 1, "us-east-1@prod": 1, "us-west-2": 1}
+    model = build_scenario("regional-outage", weights, duration=600, rate=10, seed=0)
+    served = {}
+    original_outcome = model.outcome
+
+    def outcome(region, now):
+        served[region] = served.get(region, 0) + 1
+        return original_outcome(region, now)
+
+    model.outcome = outcome
+    result = simulate(model, weights, CONFIG)
+
+    # Only the default account of us-east-1 fails, so its second account keeps the region serving
+    assert model.outages == {"us-east-1": [(120.0, 360.0, 1.0)]}
+    assert "us-west-2" not in served
+    assert served["us-east-1@prod"] > served["us-east-1"]
+    assert result["availability"] > 0.99
+
+def test_throttled_account_sits_out_cooldown_on_virtual_clock():
+    weights = {"us-east-1": 1, "us-east-1@prod": 1}
+    config = {**CONFIG, "failure_threshold": 100}
+
+    def throttled_calls(cooldown):
+        # The default account only takes 3 of the 5 calls per second failover rotates to it
+        model = ScenarioModel(list(weights), duration=60, rate=10, outages={}, quotas={"us-east-1": 3})
+        return simulate(model, weights, {**config, "throttle_cooldown": cooldown})
+
+    without_cooldown = throttled_calls(0)
+    with_cooldown = throttled_calls(10)
+    assert without_cooldown["throttled"] > 100
+    # One throttle per 10 virtual seconds: the endpoint comes back after each cooldown
+    assert 5 <= with_cooldown["throttled"] <= 10
+    assert with_cooldown["availability"] > without_cooldown["availability"]
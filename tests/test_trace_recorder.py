@@ -0,0 +1,78 @@
+import os
+import threading
+from botocore.exceptions import ClientError
+from app.services.trace_recorder import TraceRecorder, ErrorClass, read_trace, classify_error
+
+def test_flushed_records_round_trip(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path, capacity=8)
+    recorder.record(1000.0, "us-east-1", 812.5, ErrorClass.NONE, 27)
+    recorder.record(1001.0, "us-west-2@secondary", 95.0, ErrorClass.THROTTLED)
+    assert recorder.flush() == 2
+
+    # A second block introduces a new region after the first flush
+    recorder.record(1002.0, "", 0.0, ErrorClass.NO_ENDPOINT)
+    assert recorder.flush() == 1
+
+    records = [record.to_dict() for record in read_trace(path)]
+    assert records == [
+        {"timestamp": 1000.0, "region": "us-east-1", "latency_ms": 812.5, "error_class": "none", "tokens": 27},
+        {"timestamp": 1001.0, "region": "us-west-2@secondary", "latency_ms": 95.0, "error_class": "throttled", "tokens": 0},
+        {"timestamp": 1002.0, "region": "", "latency_ms": 0.0, "error_class": "no_endpoint", "tokens": 0}
+    ]
+
+def test_full_buffer_is_flushed_before_wrapping(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path, capacity=4)
+    for i in range(10):
+        recorder.record(float(i), "us-east-1", 100.0, ErrorClass.NONE)
+    recorder.flush()
+
+    assert [record.timestamp for record in read_trace(path)] == [float(i) for i in range(10)]
+    assert recorder.get_status()["dropped_count"] == 0
+
+def test_full_buffer_is_written_without_blocking_record(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path, capacity=4)
+    release = threading.Event()
+    write_block = recorder._write_block
+
+    def slow_write_block(block, pending):
+        release.wait(2)
+        return write_block(block, pending)
+
+    recorder._write_block = slow_write_block
+    for i in range(10):
+        # Blocks stay queued behind the stalled write while recording carries on
+        recorder.record(float(i), "us-east-1", 100.0, ErrorClass.NONE)
+    assert recorder.get_status()["unflushed_count"] == 2
+    assert not os.path.exists(path)
+    release.set()
+    assert recorder.flush() == 2
+
+    assert [record.timestamp for record in read_trace(path)] == [float(i) for i in range(10)]
+    assert recorder.get_status()["dropped_count"] == 0
+
+def test_failed_write_is_counted(tmp_path):
+    recorder = TraceRecorder(str(tmp_path / "missing" / "trace.bin"), capacity=4)
+    recorder.record(0.0, "us-east-1", 100.0, ErrorClass.NONE)
+    assert recorder.flush() == 0
+    assert recorder.get_status()["failed_write_count"] == 1
+    assert recorder.get_status()["unflushed_count"] == 0
+
+def test_buffer_without_file_keeps_latest_records():
+    recorder = TraceRecorder(None, capacity=4)
+    for i in range(10):
+        recorder.record(float(i), "us-east-1", 100.0, ErrorClass.NONE)
+
+    assert [record["timestamp"] for record in recorder.get_recent()] == [6.0, 7.0, 8.0, 9.0]
+    assert recorder.get_status()["dropped_count"] == 6
+    assert recorder.get_status()["unflushed_count"] == 4
+
+def test_classify_error():
+    throttled = ClientError({"Error": {"Code": "ThrottlingException"}}, "Converse")
+    invalid = ClientError({"Error": {"Code": "ValidationException"}}, "Converse")
+    assert classify_error(None) == ErrorClass.NONE
+    assert classify_error(throttled) == ErrorClass.THROTTLED
+    assert classify_error(invalid) == ErrorClass.CLIENT
+    assert classify_error(Exception("Circuit breaker is open for region us-east-1")) == ErrorClass.CIRCUIT_OPEN